@@ -7,7 +7,7 @@ Script CLI per convertire un modello 3D GeoIT3D (in formato ZIP)
 in un file glTF/GLB pronto per visualizzatori web (es. IPSES/INGV).
 
 Funzionalità principali:
-- Estrae lo ZIP in una cartella temporanea
+- Estrae lo ZIP in memoria (se abbastanza piccolo) o in una cartella temporanea
 - Legge i metadati da descriptor.json
 - (Opzionale) integra i metadati ISO/AGID da un file .xlsx
 - Costruisce la scena 3D tramite tsurf_to_trimesh.build_full_scene
@@ -18,38 +18,66 @@ Funzionalità principali:
 
 from __future__ import annotations
 
+import codecs
+import gc
 import json
+import os
+import re
 import shutil
 import struct
+import sys
 import tempfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 import click
 import trimesh
 from trimesh.exchange import gltf as gltf_export
 
+try:  # serializzatore JSON più veloce, opzionale (pip install ".[fast]")
+    import orjson
+except ImportError:
+    orjson = None
+
 from .iso_sheet import parse_iso_sheet
-from .tsurf_to_trimesh import build_full_scene
+from .tsurf_to_trimesh import ModelSource, build_full_scene, open_model_file
 # from .validation import validate_model_directory  # al momento non usata
 
 
+# Sotto questa dimensione (non compressa) lo ZIP viene estratto in memoria
+DEFAULT_IN_MEMORY_THRESHOLD = 512 * 1024 * 1024
+
+# Dimensione dei blocchi di I/O su file (estrazione ZIP e scrittura GLB)
+_COPY_BUFFER_SIZE = 1 << 20
+
+# Finestra iniziale (byte) del chunk JSON in cui cercare "asset" e "scenes"
+_JSON_SCAN_WINDOW = 64 * 1024
+
+# Spazi ammessi tra i token JSON (come json.decoder.WHITESPACE)
+_JSON_WS = re.compile(r"[ \t\n\r]*")
+
+
 # ----------------------------------------------------------------------
 # Utilità per lettura descriptor.json e costruzione extras
 # ----------------------------------------------------------------------
 
 
-def read_descriptor(model_dir: Path) -> Dict:
+def read_descriptor(model_dir: ModelSource) -> Dict:
     """
-    Legge il file descriptor.json dalla cartella del modello.
+    Legge il file descriptor.json dalla cartella del modello
+    (o dal contenuto dello ZIP estratto in memoria).
     """
-    descriptor_path = model_dir / "descriptor.json"
-    if not descriptor_path.exists():
-        raise FileNotFoundError(f"descriptor.json non trovato in {model_dir}")
+    try:
+        f = open_model_file(model_dir, "descriptor.json")
+    except FileNotFoundError:
+        where = model_dir if isinstance(model_dir, Path) else "ZIP in memoria"
+        raise FileNotFoundError(f"descriptor.json non trovato in {where}") from None
 
-    with descriptor_path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    with f:
+        return json.loads(f.read().decode("utf-8"))
 
 
 def make_asset_extras(
@@ -92,22 +120,111 @@ def make_asset_extras(
     return extras
 
 
+def write_metadata_json(asset_extras: Dict, meta_json_path: Path) -> None:
+    """
+    Scrive i metadati (asset.extras) in un file JSON indentato.
+    Usa orjson se installato, altrimenti il modulo json standard.
+    """
+    if orjson is not None:
+        meta_json_path.write_bytes(
+            orjson.dumps(
+                asset_extras,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            )
+        )
+        return
+
+    with meta_json_path.open("w", encoding="utf-8") as f:
+        json.dump(asset_extras, f, indent=2, ensure_ascii=False, allow_nan=False)
+
+
 # ----------------------------------------------------------------------
 # Estrazione ZIP e copia tabelle CSV
 # ----------------------------------------------------------------------
 
 
-def extract_zip_to_temp(zip_path: Path) -> Path:
+def extract_zip_to_temp(
+    zip_path: Path,
+    in_memory_threshold: int = 0,
+    parent_dir: Optional[Path] = None,
+    dest_dir: Optional[Path] = None,
+) -> ModelSource:
     """
-    Estrae uno ZIP in una nuova cartella temporanea e restituisce il Path.
+    Estrae uno ZIP e restituisce la sorgente del modello.
+
+    Se la dimensione non compressa dei file è inferiore a `in_memory_threshold`
+    (byte, 0 = disattivato) il contenuto resta in memoria come dict
+    {nome file: bytes}; altrimenti lo ZIP viene estratto su disco e ne viene
+    restituito il Path: in `dest_dir` se indicata (cartella già esistente),
+    altrimenti in una nuova cartella temporanea creata in `parent_dir`
+    (default: tempfile.gettempdir()). Su Linux, puntare `parent_dir` (o la
+    variabile TMPDIR) a /dev/shm fa avvenire l'estrazione in RAM (tmpfs).
+
+    Nell'estrazione su disco l'albero delle cartelle viene creato una sola
+    volta prima di estrarre i file, che sono poi copiati a blocchi da 1 MB.
     """
-    tmp_dir = Path(tempfile.mkdtemp(prefix="GeoIT3D_model_"))
-    with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(tmp_dir)
+    # ZIP prodotti da GeoIT3D, quindi fidati: nessun testzip() preliminare
+    # (rileggerebbe tutto l'archivio). Il file è letto con un buffer da 1 MB
+    # invece di quello di default, riducendo le syscall durante la decompressione.
+    with open(zip_path, "rb", buffering=_COPY_BUFFER_SIZE) as fp, zipfile.ZipFile(fp, "r", allowZip64=True) as zf:
+        members = []
+        for info in zf.infolist():
+            name = _zip_member_name(info.filename)
+            if name is not None:
+                members.append((info, name))
+
+        if _fits_in_memory(members, in_memory_threshold):
+            return {name: zf.read(info) for info, name in members if not info.is_dir()}
+
+        if dest_dir is not None:
+            tmp_dir = Path(dest_dir)
+        else:
+            tmp_dir = Path(tempfile.mkdtemp(prefix="GeoIT3D_model_", dir=parent_dir))
+        targets = [(info, tmp_dir.joinpath(*name.split("/"))) for info, name in members]
+
+        dirs = {target if info.is_dir() else target.parent for info, target in targets}
+        for d in sorted(dirs, key=lambda p: len(p.parts)):
+            d.mkdir(parents=True, exist_ok=True)
+
+        for info, target in targets:
+            if info.is_dir():
+                continue
+            with zf.open(info, "r") as src, target.open("wb") as dst:
+                shutil.copyfileobj(src, dst, _COPY_BUFFER_SIZE)
     return tmp_dir
 
 
-def copy_attribute_tables(model_dir: Path, output_dir: Path) -> None:
+def zip_fits_in_memory(zip_path: Path, in_memory_threshold: int) -> bool:
+    """
+    True se extract_zip_to_temp terrà lo ZIP in memoria con questa soglia
+    (legge solo la directory centrale dell'archivio).
+    """
+    if in_memory_threshold <= 0:
+        return False
+    with zipfile.ZipFile(zip_path, "r", allowZip64=True) as zf:
+        members = [(info, name) for info in zf.infolist() if (name := _zip_member_name(info.filename)) is not None]
+    return _fits_in_memory(members, in_memory_threshold)
+
+
+def _fits_in_memory(members: List[Tuple[zipfile.ZipInfo, str]], in_memory_threshold: int) -> bool:
+    total_size = sum(info.file_size for info, _ in members if not info.is_dir())
+    return in_memory_threshold > 0 and total_size < in_memory_threshold
+
+
+def _zip_member_name(member_name: str) -> Optional[str]:
+    """
+    Nome relativo ("a/b.csv") di un membro dello ZIP, ripulito come fa
+    ZipFile.extractall (niente percorsi assoluti, drive o "..").
+    Ritorna None se non resta alcun componente valido.
+    """
+    name = os.path.splitdrive(member_name.replace("\\", "/"))[1]
+    parts = [part for part in name.split("/") if part not in ("", ".", "..")]
+    if not parts:
+        return None
+    return "/".join(parts)
+
+
+def copy_attribute_tables(model_dir: ModelSource, output_dir: Path) -> None:
     """
     Copia le principali tabelle CSV di attributi nella cartella di output,
     se presenti.
@@ -123,11 +240,22 @@ def copy_attribute_tables(model_dir: Path, output_dir: Path) -> None:
         "main_unit_attributes.csv",
     ]
 
-    for name in csv_names:
-        src = model_dir / name
-        if src.exists():
-            dst = output_dir / name
-            shutil.copy2(src, dst)
+    def copy_one(name: str) -> None:
+        # Le tabelle mancanti si saltano all'apertura, senza exists() preliminare
+        dst = output_dir / name
+        if isinstance(model_dir, dict):
+            if name in model_dir:
+                dst.write_bytes(model_dir[name])
+            return
+        try:
+            shutil.copy2(model_dir / name, dst)
+        except FileNotFoundError:
+            pass
+
+    # Copie indipendenti e legate all'I/O: le sovrapponiamo con un piccolo
+    # pool di thread (utile su filesystem di rete, es. Google Drive in Colab)
+    with ThreadPoolExecutor(max_workers=len(csv_names)) as executor:
+        list(executor.map(copy_one, csv_names))
 
 
 # ----------------------------------------------------------------------
@@ -139,71 +267,239 @@ def export_scene_to_glb(
     scene: trimesh.Scene,
     asset_extras: Dict,
     output_glb_path: Path,
+    release_scene: bool = False,
 ) -> None:
     """
     Esporta una scena trimesh in formato GLB, inserendo asset.extras
     con i metadati forniti.
-    """
-    # 1. otteniamo il dict glTF dalla scene
-    # export senza normali per evitare vettori zero e warning validator
-    gltf_dict = gltf_export.export_gltf(scene, include_normals=False)
-
-    # 2. assicuriamoci che esista la sezione "asset"
-    if "asset" not in gltf_dict:
-        gltf_dict["asset"] = {"version": "2.0"}
-    elif "version" not in gltf_dict["asset"]:
-        gltf_dict["asset"]["version"] = "2.0"
-
-    # 3. inseriamo i metadati in asset.extras
-    gltf_dict["asset"]["extras"] = asset_extras
 
-    # 4. opzionale: potremmo inserire qualcosa anche in scenes[0].extras
-    #    per ora aggiungiamo solo l'id del modello se presente
+    Con release_scene=True le geometrie vengono rimosse dalla scena appena
+    serializzate, così vertici e facce non restano in memoria insieme al GLB
+    durante il patch e la scrittura (la scena non è più utilizzabile).
+    """
+    # 1. id del modello da inserire in scenes[0].extras (se presente)
     model_code = asset_extras.get("core_descriptor", {}).get("code")
-    if "scenes" in gltf_dict and gltf_dict["scenes"]:
-        gltf_dict["scenes"][0].setdefault("extras", {})
-        if model_code is not None:
-            gltf_dict["scenes"][0]["extras"]["model_code"] = model_code
 
-    # 5. salviamo come GLB: la versione di trimesh in Colab non espone save_glb,
-    #    quindi esportiamo i bytes e patchiamo il chunk JSON con asset.extras.
+    # 2. salviamo come GLB: la versione di trimesh in Colab non espone save_glb,
+    #    quindi esportiamo i bytes (una sola volta) e patchiamo il chunk JSON
+    #    con asset.extras, che garantisce anche asset.version=2.0.
+    #    Export senza normali per evitare vettori zero e warning validator.
+    #    I target dei bufferView vengono impostati da trimesh prima di serializzare
+    #    il JSON, così il patch successivo tocca solo asset/scenes.
     output_glb_path.parent.mkdir(parents=True, exist_ok=True)
-    glb_bytes = gltf_export.export_glb(scene, include_normals=False)
+    glb_bytes = gltf_export.export_glb(
+        scene,
+        include_normals=False,
+        tree_postprocessor=_set_buffer_view_targets,
+    )
 
-    patched_glb = _inject_asset_extras_in_glb(
+    if release_scene:
+        scene.geometry.clear()
+        # le mesh trimesh hanno riferimenti circolari (cache): forzo il rilascio
+        gc.collect()
+
+    glb_parts = _inject_asset_extras_in_glb(
         glb_bytes=glb_bytes,
         asset_extras=asset_extras,
         model_code=model_code,
     )
-    output_glb_path.write_bytes(patched_glb)
+    _write_buffers(output_glb_path, glb_parts)
 
 
-def _inject_asset_extras_in_glb(glb_bytes: bytes, asset_extras: Dict, model_code: Optional[str]) -> bytes:
+def _write_buffers(path: Path, buffers: List[Union[bytes, memoryview]]) -> None:
     """
-    Inserisce asset.extras (e opzionale model_code in scenes[0].extras) nel GLB già esportato.
+    Scrive in sequenza i buffer in `path` senza concatenarli prima in memoria,
+    con una write per buffer su un file bufferizzato a 1 MB: i segmenti piccoli
+    (header) vengono accorpati, quelli grandi passano direttamente al sistema.
 
-    Funziona patchando il chunk JSON del GLB senza dipendenze aggiuntive.
+    Su POSIX lo spazio del file viene preallocato con posix_fallocate, così
+    il filesystem non deve estenderlo a ogni scrittura.
     """
-    if len(glb_bytes) < 20:
-        return glb_bytes
+    total_size = sum(memoryview(buf).nbytes for buf in buffers)
+    with open(path, "wb", buffering=_COPY_BUFFER_SIZE) as f:
+        if total_size and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), 0, total_size)
+            except OSError:
+                # filesystem senza supporto (es. alcuni FS di rete): si scrive comunque
+                pass
+        for buf in buffers:
+            f.write(buf)
+
+
+def _inject_asset_extras_in_glb(
+    glb_bytes: bytes,
+    asset_extras: Dict,
+    model_code: Optional[str],
+) -> List[Union[bytes, memoryview]]:
+    """
+    Inserisce asset.extras (e opzionale model_code in scenes[0].extras) nel GLB già esportato.
 
-    magic, version, total_length = struct.unpack_from("<4sII", glb_bytes, 0)
-    if magic != b"glTF":
-        return glb_bytes
+    Ritorna i segmenti del nuovo GLB da scrivere in ordine (header, header del
+    chunk JSON, JSON, resto del file): il chunk binario è una vista su
+    `glb_bytes`, così il GLB completo non viene mai ricopiato in memoria.
 
-    json_chunk_len = struct.unpack_from("<I", glb_bytes, 12)[0]
-    json_chunk_type = struct.unpack_from("<I", glb_bytes, 16)[0]
+    Funziona patchando il chunk JSON del GLB senza dipendenze aggiuntive:
+    vengono riscritti solo i valori di "asset" e "scenes", il resto del
+    documento (accessors, bufferViews, meshes, ...) viene copiato così com'è.
+    Se i due membri non si trovano al primo livello si ricade sul parsing completo.
+    """
+    if len(glb_bytes) < 20:
+        return [glb_bytes]
+
+    if bytes(glb_bytes[:4]) != b"glTF":
+        return [glb_bytes]
+
+    # header (magic, version, lunghezza) + header del primo chunk, come uint32
+    # little-endian: su macchine little-endian basta una vista sui byte
+    if sys.byteorder == "little":
+        header_words = memoryview(glb_bytes)[:20].cast("I")
+    else:
+        header_words = struct.unpack_from("<5I", glb_bytes, 0)
+    json_chunk_len = header_words[3]
+    json_chunk_type = header_words[4]
     # 0x4E4F534A == b"JSON"
     if json_chunk_type != 0x4E4F534A:
-        return glb_bytes
+        return [glb_bytes]
 
     json_start = 20
     json_end = json_start + json_chunk_len
     if json_end > len(glb_bytes):
-        return glb_bytes
+        return [glb_bytes]
+
+    json_bytes = glb_bytes[json_start:json_end]
+
+    new_json = _splice_extras_in_json(json_bytes, asset_extras, model_code)
+    if new_json is None:
+        new_json = _rewrite_json_with_extras(json_bytes, asset_extras, model_code)
+
+    # Pad a multipli di 4 byte con spazi (spec GLB)
+    pad_len = (-len(new_json)) % 4
+    new_json_padded = new_json + (b" " * pad_len)
+    new_json_len = len(new_json_padded)
+
+    # Ricompongo GLB: header + chunk JSON + chunk binario originale
+    bin_part = memoryview(glb_bytes)[json_end:]
+    new_total_length = 12 + 8 + new_json_len + len(bin_part)
+
+    header = struct.pack("<4sII", b"glTF", 2, new_total_length)
+    json_header = struct.pack("<II", new_json_len, 0x4E4F534A)
+
+    return [header, json_header, new_json_padded, bin_part]
+
+
+def _dump_json_compact(obj: object) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode("utf-8")
+
+
+def _find_top_level_members(
+    json_bytes: bytes,
+    keys: Tuple[str, ...],
+) -> Optional[Dict[str, Tuple[object, int, int]]]:
+    """
+    Scorre i membri di primo livello dell'oggetto JSON e restituisce, per ogni
+    chiave richiesta, (valore, inizio, fine) del valore come offset in byte.
+
+    Si ferma non appena tutte le chiavi sono state trovate: trimesh scrive
+    "scene", "scenes" e "asset" in testa al documento, per cui viene decodificata
+    solo una finestra iniziale dei byte, allargata solo se non basta.
+    Ritorna None se il JSON non ha la forma attesa.
+    """
+    window = _JSON_SCAN_WINDOW
+    while True:
+        complete = window >= len(json_bytes)
+        # il decoder incrementale scarta un eventuale carattere UTF-8 troncato a fine finestra
+        json_text = codecs.getincrementaldecoder("utf-8")().decode(json_bytes[:window], final=complete)
+        found = _scan_top_level_members(json_text, keys)
+        if found is not None:
+            break
+        if complete:
+            return None
+        window *= 2
+
+    if json_text.isascii():
+        return found
+    # converto gli offset da caratteri a byte
+    return {
+        key: (value, len(json_text[:start].encode("utf-8")), len(json_text[:end].encode("utf-8")))
+        for key, (value, start, end) in found.items()
+    }
 
-    json_text = glb_bytes[json_start:json_end].decode("utf-8")
-    gltf_dict = json.loads(json_text)
+
+def _scan_top_level_members(json_text: str, keys: Tuple[str, ...]) -> Optional[Dict[str, Tuple[object, int, int]]]:
+    """
+    Parte testuale di _find_top_level_members: offset in caratteri, None se il
+    testo è malformato o troncato prima di aver trovato tutte le chiavi.
+    """
+    decoder = json.JSONDecoder()
+    wanted = set(keys)
+    found: Dict[str, Tuple[object, int, int]] = {}
+
+    try:
+        pos = _JSON_WS.match(json_text, 0).end()
+        if json_text[pos] != "{":
+            return None
+        pos = _JSON_WS.match(json_text, pos + 1).end()
+
+        while wanted and json_text[pos] != "}":
+            key, pos = decoder.raw_decode(json_text, pos)
+            pos = _JSON_WS.match(json_text, pos).end()
+            if not isinstance(key, str) or json_text[pos] != ":":
+                return None
+            value_start = _JSON_WS.match(json_text, pos + 1).end()
+            value, pos = decoder.raw_decode(json_text, value_start)
+            if key in wanted:
+                wanted.discard(key)
+                found[key] = (value, value_start, pos)
+            pos = _JSON_WS.match(json_text, pos).end()
+            if json_text[pos] == ",":
+                pos = _JSON_WS.match(json_text, pos + 1).end()
+    except (ValueError, IndexError):
+        return None
+
+    return found
+
+
+def _splice_extras_in_json(json_bytes: bytes, asset_extras: Dict, model_code: Optional[str]) -> Optional[bytes]:
+    """
+    Sostituisce nei byte del JSON i soli valori di "asset" (con extras) e,
+    se serve, di "scenes" (con model_code); il resto viene copiato senza
+    essere decodificato né ricodificato. Ritorna None se non è possibile.
+    """
+    members = _find_top_level_members(json_bytes, ("asset", "scenes"))
+    if members is None or "asset" not in members:
+        return None
+
+    asset, asset_start, asset_end = members["asset"]
+    if not isinstance(asset, dict):
+        return None
+    asset.setdefault("version", "2.0")
+    asset["extras"] = asset_extras
+    replacements = [(asset_start, asset_end, _dump_json_compact(asset))]
+
+    if model_code is not None and "scenes" in members:
+        scenes, scenes_start, scenes_end = members["scenes"]
+        if isinstance(scenes, list) and scenes and isinstance(scenes[0], dict):
+            scenes[0].setdefault("extras", {})
+            scenes[0]["extras"]["model_code"] = model_code
+            replacements.append((scenes_start, scenes_end, _dump_json_compact(scenes)))
+
+    parts: List[bytes] = []
+    last = 0
+    for start, end, fragment in sorted(replacements):
+        parts.append(json_bytes[last:start])
+        parts.append(fragment)
+        last = end
+    # scarto il padding originale: viene ricalcolato sul nuovo chunk
+    parts.append(json_bytes[last:].rstrip(b" "))
+    return b"".join(parts)
+
+
+def _rewrite_json_with_extras(json_bytes: bytes, asset_extras: Dict, model_code: Optional[str]) -> bytes:
+    """
+    Percorso di riserva: decodifica l'intero JSON, inserisce gli extras e lo riserializza.
+    """
+    gltf_dict = json.loads(json_bytes)
 
     # Inserisco extras
     gltf_dict.setdefault("asset", {})
@@ -215,70 +511,68 @@ def _inject_asset_extras_in_glb(glb_bytes: bytes, asset_extras: Dict, model_code
             gltf_dict["scenes"][0].setdefault("extras", {})
             gltf_dict["scenes"][0]["extras"]["model_code"] = model_code
 
-    # Imposta target dei bufferView per eliminare warning dei validator
-    def _set_buffer_view_targets(gltf: Dict) -> None:
-        buffer_views = gltf.get("bufferViews")
-        accessors = gltf.get("accessors")
-        meshes = gltf.get("meshes")
-        if not isinstance(buffer_views, list) or not isinstance(accessors, list) or not isinstance(meshes, list):
-            return
-
-        index_accessor_ids = set()
-        attribute_accessor_ids = set()
-
-        for mesh in meshes:
-            if not isinstance(mesh, dict):
-                continue
-            for prim in mesh.get("primitives", []):
-                if not isinstance(prim, dict):
-                    continue
-                if "indices" in prim:
-                    index_accessor_ids.add(prim["indices"])
-                for attr_id in prim.get("attributes", {}).values():
-                    attribute_accessor_ids.add(attr_id)
-
-        # bufferView per accessors di indici -> ELEMENT_ARRAY_BUFFER (34963)
-        for acc_id in index_accessor_ids:
-            if not (isinstance(acc_id, int) and 0 <= acc_id < len(accessors)):
-                continue
-            acc = accessors[acc_id]
-            if not isinstance(acc, dict):
-                continue
-            bv_id = acc.get("bufferView")
-            if isinstance(bv_id, int) and 0 <= bv_id < len(buffer_views):
-                bv = buffer_views[bv_id]
-                if isinstance(bv, dict) and "target" not in bv:
-                    bv["target"] = 34963
-
-        # bufferView per accessors di attributi -> ARRAY_BUFFER (34962)
-        for acc_id in attribute_accessor_ids:
-            if not (isinstance(acc_id, int) and 0 <= acc_id < len(accessors)):
-                continue
-            acc = accessors[acc_id]
-            if not isinstance(acc, dict):
-                continue
-            bv_id = acc.get("bufferView")
-            if isinstance(bv_id, int) and 0 <= bv_id < len(buffer_views):
-                bv = buffer_views[bv_id]
-                if isinstance(bv, dict) and "target" not in bv:
-                    bv["target"] = 34962
-
     _set_buffer_view_targets(gltf_dict)
 
-    new_json = json.dumps(gltf_dict, separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode("utf-8")
-    # Pad a multipli di 4 byte con spazi (spec GLB)
-    pad_len = (-len(new_json)) % 4
-    new_json_padded = new_json + (b" " * pad_len)
-    new_json_len = len(new_json_padded)
+    return _dump_json_compact(gltf_dict)
 
-    # Ricompongo GLB: header + chunk JSON + chunk binario originale
-    bin_part = glb_bytes[json_end:]
-    new_total_length = 12 + 8 + new_json_len + len(bin_part)
 
-    header = struct.pack("<4sII", b"glTF", 2, new_total_length)
-    json_header = struct.pack("<II", new_json_len, 0x4E4F534A)
+def _set_buffer_view_targets(gltf: Dict) -> None:
+    """
+    Imposta target dei bufferView per eliminare warning dei validator.
 
-    return header + json_header + new_json_padded + bin_part
+    Usata come tree_postprocessor di trimesh, prima della serializzazione
+    del JSON, oppure sul dict decodificato nel percorso di riserva.
+    """
+    buffer_views = gltf.get("bufferViews")
+    accessors = gltf.get("accessors")
+    meshes = gltf.get("meshes")
+    if not isinstance(buffer_views, list) or not isinstance(accessors, list) or not isinstance(meshes, list):
+        return
+
+    # caso comune con versioni di trimesh che impostano già i target:
+    # nulla da correggere, evito di attraversare mesh e accessors
+    if all(isinstance(bv, dict) and "target" in bv for bv in buffer_views):
+        return
+
+    index_accessor_ids = set()
+    attribute_accessor_ids = set()
+
+    for mesh in meshes:
+        if not isinstance(mesh, dict):
+            continue
+        for prim in mesh.get("primitives", []):
+            if not isinstance(prim, dict):
+                continue
+            if "indices" in prim:
+                index_accessor_ids.add(prim["indices"])
+            for attr_id in prim.get("attributes", {}).values():
+                attribute_accessor_ids.add(attr_id)
+
+    # bufferView per accessors di indici -> ELEMENT_ARRAY_BUFFER (34963)
+    for acc_id in index_accessor_ids:
+        if not (isinstance(acc_id, int) and 0 <= acc_id < len(accessors)):
+            continue
+        acc = accessors[acc_id]
+        if not isinstance(acc, dict):
+            continue
+        bv_id = acc.get("bufferView")
+        if isinstance(bv_id, int) and 0 <= bv_id < len(buffer_views):
+            bv = buffer_views[bv_id]
+            if isinstance(bv, dict) and "target" not in bv:
+                bv["target"] = 34963
+
+    # bufferView per accessors di attributi -> ARRAY_BUFFER (34962)
+    for acc_id in attribute_accessor_ids:
+        if not (isinstance(acc_id, int) and 0 <= acc_id < len(accessors)):
+            continue
+        acc = accessors[acc_id]
+        if not isinstance(acc, dict):
+            continue
+        bv_id = acc.get("bufferView")
+        if isinstance(bv_id, int) and 0 <= bv_id < len(buffer_views):
+            bv = buffer_views[bv_id]
+            if isinstance(bv, dict) and "target" not in bv:
+                bv["target"] = 34962
 
 
 # ----------------------------------------------------------------------
@@ -303,16 +597,30 @@ def _inject_asset_extras_in_glb(glb_bytes: bytes, asset_extras: Dict, model_code
     type=click.Path(exists=True, dir_okay=False, path_type=Path),
     help="Foglio metadati ISO/AGID in formato .xlsx (opzionale).",
 )
+@click.option(
+    "--in-memory-threshold",
+    type=click.IntRange(min=0),
+    default=DEFAULT_IN_MEMORY_THRESHOLD,
+    show_default=True,
+    help="Dimensione massima (byte, non compressa) dello ZIP da estrarre in memoria invece che su disco. 0 = estrai sempre su disco.",
+)
+@click.option(
+    "--temp-dir",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help="Cartella in cui creare la cartella temporanea di estrazione (default: quella di sistema, TMPDIR). Su Linux /dev/shm estrae in RAM.",
+)
 @click.option(
     "--keep-temp",
     is_flag=True,
     default=False,
-    help="Se impostato, non cancella la cartella temporanea di estrazione dello ZIP (utile per debug).",
+    help="Se impostato, estrae sempre lo ZIP su disco (ignora --in-memory-threshold) e non cancella la cartella temporanea di estrazione (utile per debug).",
 )
 def main(
     zip_path: Path,
     output_dir: Path,
     iso_sheet: Optional[Path],
+    in_memory_threshold: int,
+    temp_dir: Optional[Path],
     keep_temp: bool,
 ) -> None:
     """
@@ -325,49 +633,68 @@ def main(
           --iso-sheet Metadata_Modelli3D_ISO_F184.xlsx
     """
 
-    # 1. Estrazione ZIP
-    tmp_dir = extract_zip_to_temp(zip_path)
-
-    try:
-        # 2. (Opzionale) Validazione interna - al momento NON usata
-        # validate_model_directory(tmp_dir)
-
-        # 3. Metadati: descriptor.json + (eventuale) ISO/AGID
-        descriptor = read_descriptor(tmp_dir)
-        iso_agid = parse_iso_sheet(iso_sheet) if iso_sheet is not None else None
-
-        # 4. Costruzione scena 3D e metadati per superficie
-        #    build_full_scene ritorna:
-        #    - scene: trimesh.Scene
-        #    - surfaces_meta: dict con info su ogni superficie
-        scene, surfaces_meta = build_full_scene(tmp_dir)
-
-        # 5. Costruzione oggetto extras (asset.extras)
-        asset_extras = make_asset_extras(descriptor, iso_agid, surfaces_meta)
-
-        # 6. Esportazione GLB
-        output_dir.mkdir(parents=True, exist_ok=True)
-        base_name = zip_path.stem
-        glb_path = output_dir / f"{base_name}.glb"
-        export_scene_to_glb(scene, asset_extras, glb_path)
-
-        # 7. Metadati JSON esterno
-        meta_json_path = output_dir / f"{base_name}_metadata.json"
-        with meta_json_path.open("w", encoding="utf-8") as f:
-            json.dump(asset_extras, f, indent=2, ensure_ascii=False, allow_nan=False)
-
-        # 8. Copia tabelle CSV di attributi (disabilitato su richiesta: non serve esportarle)
-        # copy_attribute_tables(tmp_dir, output_dir)
-
-        click.echo(f"[OK] Conversione completata.")
-        click.echo(f"     GLB: {glb_path}")
-        click.echo(f"     Metadati: {meta_json_path}")
-
-    finally:
-        if not keep_temp:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
-        else:
-            click.echo(f"[INFO] Cartella temporanea conservata in: {tmp_dir}")
+    # 1. Estrazione ZIP: senza --keep-temp la cartella temporanea è gestita
+    #    da TemporaryDirectory e rimossa all'uscita dal blocco. Se lo ZIP
+    #    resta in memoria non si crea nessuna cartella. Con --keep-temp
+    #    l'estrazione è sempre su disco, così la cartella esiste davvero
+    if keep_temp:
+        in_memory_threshold = 0
+    if keep_temp or zip_fits_in_memory(zip_path, in_memory_threshold):
+        tmp_ctx = nullcontext(None)
+    else:
+        tmp_ctx = tempfile.TemporaryDirectory(
+            prefix="GeoIT3D_model_",
+            dir=temp_dir,
+            ignore_cleanup_errors=True,
+        )
+
+    with tmp_ctx as td:
+        tmp_dir = extract_zip_to_temp(
+            zip_path,
+            in_memory_threshold=in_memory_threshold,
+            parent_dir=temp_dir,
+            dest_dir=Path(td) if td is not None else None,
+        )
+
+        try:
+            # 2. (Opzionale) Validazione interna - al momento NON usata
+            # validate_model_directory(tmp_dir)
+
+            # 3. Metadati: descriptor.json + (eventuale) ISO/AGID
+            descriptor = read_descriptor(tmp_dir)
+            iso_agid = parse_iso_sheet(iso_sheet) if iso_sheet is not None else None
+
+            # 4. Costruzione scena 3D e metadati per superficie
+            #    build_full_scene ritorna:
+            #    - scene: trimesh.Scene
+            #    - surfaces_meta: dict con info su ogni superficie
+            scene, surfaces_meta = build_full_scene(tmp_dir)
+
+            # 5. Costruzione oggetto extras (asset.extras)
+            asset_extras = make_asset_extras(descriptor, iso_agid, surfaces_meta)
+
+            # 6. Esportazione GLB
+            output_dir.mkdir(parents=True, exist_ok=True)
+            base_name = zip_path.stem
+            glb_path = output_dir / f"{base_name}.glb"
+            export_scene_to_glb(scene, asset_extras, glb_path, release_scene=True)
+            del scene
+
+            # 7. Metadati JSON esterno
+            meta_json_path = output_dir / f"{base_name}_metadata.json"
+            write_metadata_json(asset_extras, meta_json_path)
+
+            # 8. Copia tabelle CSV di attributi (disabilitato su richiesta: non serve esportarle)
+            # copy_attribute_tables(tmp_dir, output_dir)
+
+            click.echo(f"[OK] Conversione completata.")
+            click.echo(f"     GLB: {glb_path}")
+            click.echo(f"     Metadati: {meta_json_path}")
+
+        finally:
+            # con --keep-temp tmp_dir è sempre una cartella su disco
+            if keep_temp:
+                click.echo(f"[INFO] Cartella temporanea conservata in: {tmp_dir}")
 
 
 if __name__ == "__main__":
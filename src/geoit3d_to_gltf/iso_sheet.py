@@ -17,10 +17,15 @@ Il modulo:
   - location (toponym, country_uri, region_uris, city_uri)
 """
 
+import re
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import pandas as pd
+from openpyxl import load_workbook
+
+
+# Numero in una riga del perimetro (es. "183559.324" o "183559,324")
+_COORD_RE = re.compile(r"\d+(?:[.,]\d+)?")
 
 
 def parse_iso_sheet(xlsx_path: Path, sheet_name: str = "ISO_AGID_format") -> Dict[str, Any]:
@@ -43,7 +48,7 @@ def parse_iso_sheet(xlsx_path: Path, sheet_name: str = "ISO_AGID_format") -> Dic
     dict
         Oggetto JSON `iso_agid` con i campi principali.
     """
-    df = pd.read_excel(xlsx_path, sheet_name=sheet_name)
+    header, rows = _read_sheet_rows(xlsx_path, sheet_name)
 
     # Le colonne possono essere ad es.:
     #  - colonna 0: "Campo"
@@ -53,56 +58,34 @@ def parse_iso_sheet(xlsx_path: Path, sheet_name: str = "ISO_AGID_format") -> Dic
     #
     # Qui assumiamo:
     #   - i testi stanno in 'modello ' (attenzione allo spazio finale)
-    #   - la cardinalità in colonna 2
-    #   - la descrizione/label in colonna 0-2
+    #   - il nome del campo in colonna 0 oppure, per i sottocampi
+    #     (SRS, Zmin, Country, ...), in colonna 1
 
     # Provo a identificare dinamicamente la colonna dei valori
-    value_col_name = None
-    for col in df.columns:
+    value_col = None
+    for i, col in enumerate(header):
         # tipicamente è "modello " ma ci teniamo larghi
         if isinstance(col, str) and "modello" in col.lower():
-            value_col_name = col
+            value_col = i
             break
 
-    if value_col_name is None:
+    if value_col is None:
         raise ValueError("Colonna per i valori del modello non trovata (es. 'modello ').")
 
-    # colonne di descrizione (potresti adattarle in base al tuo file specifico)
-    col0 = df.columns[0]
-    col1 = df.columns[1] if len(df.columns) > 1 else None
-    col2 = df.columns[2] if len(df.columns) > 2 else None
-
-    def make_key(row) -> str:
-        parts: List[str] = []
-        for col in (col0, col1):
-            if col is None:
-                continue
-            v = row.get(col)
-            if isinstance(v, str) and v.strip():
-                parts.append(v.strip())
-        # includo cardinalità nel nome chiave per distinguerla, se serve
-        card = row.get(col2) if col2 is not None else None
-        if isinstance(card, str) and card.strip():
-            parts.append(card.strip())
-        return " / ".join(parts)
-
-    raw_map: Dict[str, Any] = {}
-
-    for _, row in df.iterrows():
-        val = row.get(value_col_name)
+    # raw_map: nome campo -> valori, nell'ordine delle righe del foglio.
+    # Le ricerche confrontano il prefisso (a caratteri) del nome, così
+    # "Toponym" trova la riga "Toponym Location" e "Keyword" la riga "Keywords".
+    raw_map: Dict[str, List[str]] = {}
+
+    for row in rows:
+        val = _cell(row, value_col)
         if not isinstance(val, str) or not val.strip():
             continue
-
-        key = make_key(row)
-        cardinality = str(row.get(col2)) if col2 is not None and row.get(col2) is not None else ""
-
-        # Se cardinalità è 1..Many accumuliamo in lista
-        if "1..Many" in cardinality and key in raw_map:
-            if not isinstance(raw_map[key], list):
-                raw_map[key] = [raw_map[key]]
-            raw_map[key].append(val.strip())
-        else:
-            raw_map[key] = val.strip()
+        # colonne di descrizione (potresti adattarle in base al tuo file specifico)
+        field = _field_name(_cell(row, 0), _cell(row, 1))
+        if field is None:
+            continue
+        raw_map.setdefault(field, []).append(val.strip())
 
     # Adesso costruiamo un oggetto iso_agid compatto da raw_map
     # (i nomi chiave qui sono basati sulla tua struttura tipica ISO)
@@ -126,7 +109,7 @@ def parse_iso_sheet(xlsx_path: Path, sheet_name: str = "ISO_AGID_format") -> Dic
     # Localizzazione
     toponym = _get_first_by_prefix(raw_map, "Toponym")
     country_uri = _get_first_by_prefix(raw_map, "Country")
-    region_uri = _get_first_by_prefix(raw_map, "Region")
+    region_uris = _values_by_prefix(raw_map, "Region") or None
     city_uri = _get_first_by_prefix(raw_map, "City")
 
     iso_agid: Dict[str, Any] = {
@@ -145,7 +128,7 @@ def parse_iso_sheet(xlsx_path: Path, sheet_name: str = "ISO_AGID_format") -> Dic
         "location": {
             "toponym": toponym,
             "country_uri": country_uri,
-            "region_uris": [region_uri] if isinstance(region_uri, str) else region_uri,
+            "region_uris": region_uris,
             "city_uri": city_uri,
         },
     }
@@ -158,85 +141,96 @@ def parse_iso_sheet(xlsx_path: Path, sheet_name: str = "ISO_AGID_format") -> Dic
 # ----------------------------------------------------------------------
 
 
-def _get_first_by_prefix(raw_map: Dict[str, Any], prefix: str) -> Optional[str]:
+def _read_sheet_rows(xlsx_path: Path, sheet_name: str) -> Tuple[Tuple[Any, ...], List[Tuple[Any, ...]]]:
+    """
+    Legge i valori del foglio con openpyxl in modalità read-only (streaming,
+    senza costruire le celle né un DataFrame) e ritorna (intestazione, righe).
+    """
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            raise ValueError(f"Foglio '{sheet_name}' non trovato in {xlsx_path}")
+        rows = list(wb[sheet_name].iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+    if not rows:
+        return (), []
+    return rows[0], rows[1:]
+
+
+def _cell(row: Tuple[Any, ...], idx: int) -> Any:
+    # in modalità read-only le righe possono essere più corte dell'intestazione
+    return row[idx] if idx < len(row) else None
+
+
+def _field_name(label0: Any, label1: Any) -> Optional[str]:
     """
-    Ritorna il primo valore di raw_map la cui chiave inizia con `prefix`.
-    Utile perché le chiavi sono tipo: "Identifier / 1", "Title / 1", ecc.
+    Nome del campo di una riga: la prima etichetta non vuota tra colonna 0 e 1.
     """
-    for key, val in raw_map.items():
+    for v in (label0, label1):
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+    return None
+
+
+def _values_by_prefix(raw_map: Dict[str, List[str]], prefix: str) -> List[str]:
+    """
+    Valori di tutti i campi il cui nome inizia con `prefix`, nell'ordine del foglio.
+    """
+    values: List[str] = []
+    for key, vals in raw_map.items():
         if key.startswith(prefix):
-            return val if isinstance(val, str) else None
+            values.extend(vals)
+    return values
+
+
+def _get_first_by_prefix(raw_map: Dict[str, List[str]], prefix: str) -> Optional[str]:
+    """
+    Ritorna il valore del primo campo il cui nome inizia con `prefix`.
+    Se la riga del campo è ripetuta vale l'ultima, come per i campi a
+    cardinalità singola.
+    """
+    for key, vals in raw_map.items():
+        if key.startswith(prefix):
+            return vals[-1]
     return None
 
 
-def _parse_keywords(raw_map: Dict[str, Any]) -> List[str]:
+def _parse_keywords(raw_map: Dict[str, List[str]]) -> List[str]:
     """
-    Estrae le keyword gestendo sia il caso stringa unica sia liste.
+    Estrae le keyword (separate da virgola) da tutte le righe "Keyword".
     """
     kw_list: List[str] = []
 
-    for key, val in raw_map.items():
-        if key.startswith("Keyword"):
-            if isinstance(val, str):
-                kw_list.extend([k.strip() for k in val.split(",") if k.strip()])
-            elif isinstance(val, list):
-                for item in val:
-                    if isinstance(item, str):
-                        kw_list.extend([k.strip() for k in item.split(",") if k.strip()])
+    for val in _values_by_prefix(raw_map, "Keyword"):
+        kw_list.extend([k.strip() for k in val.split(",") if k.strip()])
 
     # Rimuovo duplicati mantenendo ordine
-    seen = set()
-    result: List[str] = []
-    for k in kw_list:
-        if k not in seen:
-            seen.add(k)
-            result.append(k)
-    return result
+    return list(dict.fromkeys(kw_list))
 
 
-def _parse_polygon(raw_map: Dict[str, Any]) -> Optional[List[List[float]]]:
+def _parse_polygon(raw_map: Dict[str, List[str]]) -> Optional[List[List[float]]]:
     """
     Prova a interpretare il "Shape perimeter" o equivalente come lista di
     coordinate [x, y]. Molto dipendente da come viene scritto nel foglio.
     """
-    txt = None
-    for key, val in raw_map.items():
-        if key.startswith("Shape perimeter") and isinstance(val, str):
-            txt = val
-            break
+    txt = _get_first_by_prefix(raw_map, "Shape perimeter")
 
     if txt is None:
         return None
 
     coords: List[List[float]] = []
-    lines = txt.splitlines()
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+    for line in txt.splitlines():
         # Qui ci si aspetta qualcosa tipo: "X 183559.324 - Y 4968420.614"
         # ma la sintassi reale può variare. Cerchiamo di essere robusti:
-        lowered = line.lower()
-        if "x" in lowered and "y" in lowered:
-            # rimuovo lettere e separatori grossi
-            tmp = (
-                lowered.replace("x", " ")
-                .replace("y", " ")
-                .replace("-", " ")
-                .replace(":", " ")
-            )
-            tokens = [t for t in tmp.split() if t]
-            # cerco le prime due cose che sembrano numeri
-            nums: List[float] = []
-            for t in tokens:
-                try:
-                    nums.append(float(t.replace(",", ".")))
-                except ValueError:
-                    continue
-                if len(nums) == 2:
-                    break
-            if len(nums) == 2:
-                coords.append(nums)
+        # considero solo le righe con X e Y e prendo i primi due numeri
+        # ("-" e ":" fanno da separatori, la virgola può essere decimale)
+        if not (("x" in line or "X" in line) and ("y" in line or "Y" in line)):
+            continue
+        nums = _COORD_RE.findall(line)[:2]
+        if len(nums) == 2:
+            coords.append([float(nums[0].replace(",", ".")), float(nums[1].replace(",", "."))])
 
     return coords or None
 
@@ -250,7 +244,7 @@ def _parse_float(v: Any) -> Optional[float]:
         return None
 
 
-def _collect_authors(raw_map: Dict[str, Any]) -> List[Dict[str, str]]:
+def _collect_authors(raw_map: Dict[str, List[str]]) -> List[Dict[str, str]]:
     """
     Estrae un elenco di autori a partire da chiavi che iniziano con 'Authors'
     o simili. Questa parte è volutamente generica: può essere adattata
@@ -258,8 +252,7 @@ def _collect_authors(raw_map: Dict[str, Any]) -> List[Dict[str, str]]:
     """
     authors: List[Dict[str, str]] = []
 
-    for key, val in raw_map.items():
-        if key.startswith("Authors") and isinstance(val, str):
-            authors.append({"name": val, "organization": None})
+    for val in _values_by_prefix(raw_map, "Authors"):
+        authors.append({"name": val, "organization": None})
 
     return authors
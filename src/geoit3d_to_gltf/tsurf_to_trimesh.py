@@ -12,21 +12,62 @@ Questo modulo:
 - restituisce:
     - scene: trimesh.Scene
     - surfaces_metadata: dict[ID_superficie] -> {group, node_name, attributes}
+
+Il modello può essere una cartella su disco oppure il contenuto dello ZIP
+già estratto in memoria (dict nome file -> bytes), vedi ModelSource.
 """
 
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
+import hashlib
 import math
+import os
+import sys
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import BinaryIO, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 import trimesh
+from trimesh.visual.material import PBRMaterial
 import csv
 import zipfile
-from io import TextIOWrapper
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO, TextIOWrapper
+
+
+# Sorgente dei file del modello: cartella estratta su disco oppure
+# contenuto dello ZIP tenuto in memoria ({nome file: bytes})
+ModelSource = Union[Path, Dict[str, bytes]]
+
+
+# ----------------------------------------------------------------------
+# Accesso ai file del modello (cartella o memoria)
+# ----------------------------------------------------------------------
+
+
+def as_model_source(model_dir: Union[ModelSource, str]) -> ModelSource:
+    """
+    Normalizza la sorgente del modello: i dict restano tali, il resto diventa Path.
+    """
+    if isinstance(model_dir, dict):
+        return model_dir
+    return Path(model_dir)
+
+
+def open_model_file(model_dir: ModelSource, name: str) -> BinaryIO:
+    """
+    Apre in lettura binaria il file `name` del modello.
+    Solleva FileNotFoundError se il file non è presente.
+    """
+    if isinstance(model_dir, dict):
+        if name not in model_dir:
+            raise FileNotFoundError(f"{name} non trovato nel modello")
+        return BytesIO(model_dir[name])
+    return (model_dir / name).open("rb")
 
 
 # ----------------------------------------------------------------------
@@ -42,9 +83,10 @@ class SurfaceGeometry:
     id: str                 # es. SRF_0001_001, FLT_0001_001, UNT_0001_001, dem
     group: str              # DEM / HORIZON / FAULT / UNIT
     node_name: str          # nome del nodo nella scena (es. HORIZON_AES_SRF_0001_001)
-    vertices: np.ndarray    # (N, 3)
-    faces: Optional[np.ndarray]  # (M, 3) oppure None se mancano triangoli
+    vertices: np.ndarray    # (N, 3) float32, relativi a origin
+    faces: Optional[np.ndarray]  # (M, 3) uint32 oppure None se mancano triangoli
     attributes: Dict[str, str]   # attributi provenienti dalle CSV (se presenti)
+    origin: Optional[np.ndarray] = None  # (3,) float64, baricentro sottratto ai vertici
 
 
 # ----------------------------------------------------------------------
@@ -57,31 +99,61 @@ def parse_gocad_tsurf_file(tsurf_path: Path, group: str) -> List[SurfaceGeometry
     Legge un file GOCAD TSurf che può contenere più superfici (più blocchi
     'GOCAD TSurf 1 ... TFACE ...') e restituisce una lista di SurfaceGeometry
     (per ora senza attributi, che verranno aggiunti a parte).
+
+    Il file è letto riga per riga: in memoria resta solo la superficie corrente.
+    """
+    with tsurf_path.open("r", encoding="utf-8", errors="ignore", buffering=_TS_READ_BUFFER_SIZE) as f:
+        return parse_gocad_tsurf_lines(f, group)
+
+
+def parse_gocad_tsurf_text(text: str, group: str) -> List[SurfaceGeometry]:
+    """
+    Come parse_gocad_tsurf_file, ma a partire dal contenuto del file .ts
+    già letto in una stringa.
     """
-    text_lines = tsurf_path.read_text(encoding="utf-8", errors="ignore").splitlines()
+    return parse_gocad_tsurf_lines(text.splitlines(), group)
 
-    # surfaces_raw: lista di tuple (surf_name, vertices_dict, faces_list)
-    surfaces_raw: List[Tuple[str, Dict[int, Tuple[float, float, float]], List[Tuple[int, int, int]]]] = []
 
-    vertices: Dict[int, Tuple[float, float, float]] = {}
-    faces: List[Tuple[int, int, int]] = []
+def parse_gocad_tsurf_lines(lines: Iterable[str], group: str) -> List[SurfaceGeometry]:
+    """
+    Come parse_gocad_tsurf_file, a partire da un iterabile di righe
+    (file aperto in modo testo, stream da ZIP, lista di stringhe).
+
+    Le righe PVRTX/VRTX e TRGL della superficie corrente vengono solo
+    accumulate e poi convertite in blocco con np.loadtxt, senza passare
+    per split()/float() riga per riga.
+    """
+    surfaces: List[SurfaceGeometry] = []
+
+    vrtx_lines: List[str] = []
+    trgl_lines: List[str] = []
     surf_name: Optional[str] = None
     in_header = False
 
     # Aggiungiamo una riga sentinella per flush finale
-    for line in text_lines + ["GOCAD TSurf EOF"]:
-        line = line.strip()
-        if not line:
-            continue
+    for line in chain(lines, ["GOCAD TSurf EOF"]):
+        line = line.lstrip()
+
+        # Righe geometriche: sono quasi tutte, si controllano per prime
+        if line.startswith(_VRTX_PREFIXES):
+            if not in_header:
+                vrtx_lines.append(line)
+                continue
+        elif line.startswith(_TRGL_PREFIXES):
+            if not in_header:
+                trgl_lines.append(line)
+                continue
 
         if line.startswith("GOCAD TSurf"):
             # Chiudo l’eventuale superficie precedente
-            if surf_name is not None and vertices:
-                surfaces_raw.append((surf_name, vertices, faces))
+            if surf_name is not None and vrtx_lines:
+                surf = _build_surface(surf_name, group, vrtx_lines, trgl_lines)
+                if surf is not None:
+                    surfaces.append(surf)
 
             # Reset per la nuova superficie
-            vertices = {}
-            faces = []
+            vrtx_lines = []
+            trgl_lines = []
             surf_name = None
             in_header = False
             continue
@@ -93,71 +165,144 @@ def parse_gocad_tsurf_file(tsurf_path: Path, group: str) -> List[SurfaceGeometry
         if in_header:
             if line.startswith("}"):
                 in_header = False
-            elif line.lower().startswith("name:"):
+            elif line[:5].lower() == "name:":
                 surf_name = line.split(":", 1)[1].strip()
             continue
 
-        # Parte geometrica
-        parts = line.split()
-        if not parts:
-            continue
+        # Ignora altre parole chiave (TFACE, BSTONE, BORDER, ecc.)
 
-        if parts[0] in ("PVRTX", "VRTX"):
-            # PVRTX id x y z ...
-            try:
-                vid = int(parts[1])
-                x, y, z = map(float, parts[2:5])
-                vertices[vid] = (x, y, z)
-            except Exception:
-                # Ignora righe malformate
-                pass
+    return surfaces
 
-        elif parts[0] == "TRGL":
-            try:
-                i, j, k = map(int, parts[1:4])
-                faces.append((i, j, k))
-            except Exception:
-                pass
-        else:
-            # Ignora altre parole chiave (BSTONE, BORDER, ecc.)
-            pass
 
-    # Flush finale se c'è una superficie ancora aperta
-    if surf_name is not None and vertices:
-        surfaces_raw.append((surf_name, vertices, faces))
+# Buffer di lettura dei file .ts e parole chiave delle righe geometriche
+# (PVRTX/VRTX id x y z ..., TRGL i j k)
+_TS_READ_BUFFER_SIZE = 1 << 20
+_VRTX_PREFIXES = ("PVRTX ", "PVRTX\t", "VRTX ", "VRTX\t")
+_TRGL_PREFIXES = ("TRGL ", "TRGL\t")
 
-    surfaces: List[SurfaceGeometry] = []
 
-    for name, verts_dict, faces_list in surfaces_raw:
-        # Mappa ID dei vertici in indici 0..N-1
-        sorted_ids = sorted(verts_dict.keys())
-        id_to_idx = {vid: i for i, vid in enumerate(sorted_ids)}
-        verts = np.array([verts_dict[vid] for vid in sorted_ids], dtype=float)
+def _build_surface(name: str, group: str, vrtx_lines: List[str], trgl_lines: List[str]) -> Optional[SurfaceGeometry]:
+    """
+    Converte le righe PVRTX/VRTX e TRGL di una superficie in SurfaceGeometry.
+    Ritorna None se nessun vertice è valido (superficie scartata, come le
+    superfici senza vertici).
+    """
+    vids, xyz = _parse_vertex_lines(vrtx_lines)
+    if not len(vids):
+        return None
+    tri = _parse_triangle_lines(trgl_lines)
+
+    # Mappa ID dei vertici in indici 0..N-1 (ID ordinati)
+    sorted_ids, verts = _sort_vertices_by_id(vids, xyz)
+
+    # Le coordinate (UTM) non stanno in float32 senza perdere ~0.5 m:
+    # si sottrae il baricentro in float64 e si tengono i residui in float32,
+    # il baricentro diventa la traslazione del nodo nella scena
+    origin = verts.mean(axis=0)
+    verts = (verts - origin).astype(np.float32)
+
+    if len(tri):
+        faces_arr = _remap_vertex_ids(sorted_ids, tri).astype(np.uint32)
+    else:
+        faces_arr = None
+
+    # ID base = nome TSurf
+    surf_id = name  # es. SRF_0001_001
+    node_name = f"{group}_{surf_id}"
+
+    return SurfaceGeometry(
+        id=surf_id,
+        group=group,
+        node_name=node_name,
+        vertices=verts,
+        faces=faces_arr,
+        attributes={},  # riempito poi
+        origin=origin,
+    )
+
+
+def _sort_vertices_by_id(vids: np.ndarray, xyz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ordina i vertici per ID. A parità di ID vale l'ultimo vertice letto,
+    come nel parser originale basato su dict.
+    """
+    order = np.argsort(vids, kind="stable")
+    sorted_ids = vids[order]
+    # Con l'ordinamento stabile l'ultima occorrenza di ogni ID chiude il suo gruppo
+    last = np.ones(len(sorted_ids), dtype=bool)
+    last[:-1] = sorted_ids[1:] != sorted_ids[:-1]
+    if not last.all():
+        order = order[last]
+        sorted_ids = sorted_ids[last]
+    return sorted_ids, xyz[order]
+
+
+def _remap_vertex_ids(sorted_ids: np.ndarray, tri: np.ndarray) -> np.ndarray:
+    """
+    Converte gli ID vertici dei triangoli negli indici 0..N-1 di sorted_ids.
+    Solleva KeyError se un triangolo usa un vertice non definito.
+    """
+    idx = np.searchsorted(sorted_ids, tri)
+    np.minimum(idx, len(sorted_ids) - 1, out=idx)
+    missing = sorted_ids[idx] != tri
+    if missing.any():
+        raise KeyError(int(tri[missing][0]))
+    return idx
+
 
-        if faces_list:
-            faces_arr = np.array(
-                [[id_to_idx[i], id_to_idx[j], id_to_idx[k]] for (i, j, k) in faces_list],
-                dtype=np.int64,
-            )
-        else:
-            faces_arr = None
-
-        # ID base = nome TSurf
-        surf_id = name  # es. SRF_0001_001
-        node_name = f"{group}_{surf_id}"
-
-        surfaces.append(
-            SurfaceGeometry(
-                id=surf_id,
-                group=group,
-                node_name=node_name,
-                vertices=verts,
-                faces=faces_arr,
-                attributes={},  # riempito poi
-            )
-        )
+def _parse_vertex_lines(lines: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converte le righe PVRTX/VRTX in (ID vertici int64 (N,), coordinate float64 (N, 3)).
+    """
+    n = len(lines)
+    if not n:
+        return np.empty(0, dtype=np.int64), np.empty((0, 3), dtype=np.float64)
+    try:
+        # Con max_rows noto loadtxt alloca l'array una volta sola
+        data = np.loadtxt(lines, usecols=(1, 2, 3, 4), dtype=np.float64, ndmin=2, comments=None, max_rows=n)
+        vids = data[:, 0].astype(np.int64)
+        if np.array_equal(vids, data[:, 0]):
+            return vids, data[:, 1:4]
+    except ValueError:
+        pass
 
-    return surfaces
+    # Righe malformate: si torna alla conversione riga per riga, ignorandole
+    ids = np.empty(n, dtype=np.int64)
+    coords = np.empty((n, 3), dtype=np.float64)
+    count = 0
+    for line in lines:
+        parts = line.split()
+        try:
+            ids[count] = int(parts[1])
+            coords[count] = [float(v) for v in parts[2:5]]
+        except Exception:
+            continue
+        count += 1
+    return ids[:count], coords[:count]
+
+
+def _parse_triangle_lines(lines: List[str]) -> np.ndarray:
+    """
+    Converte le righe TRGL in un array (M, 3) int64 di ID vertici.
+    """
+    n = len(lines)
+    if not n:
+        return np.empty((0, 3), dtype=np.int64)
+    try:
+        return np.loadtxt(lines, usecols=(1, 2, 3), dtype=np.int64, ndmin=2, comments=None, max_rows=n)
+    except ValueError:
+        pass
+
+    # Righe malformate: si torna alla conversione riga per riga, ignorandole
+    faces = np.empty((n, 3), dtype=np.int64)
+    count = 0
+    for line in lines:
+        try:
+            faces[count] = [int(v) for v in line.split()[1:4]]
+        except Exception:
+            continue
+        count += 1
+    return faces[:count]
 
 
 # ----------------------------------------------------------------------
@@ -165,20 +310,57 @@ def parse_gocad_tsurf_file(tsurf_path: Path, group: str) -> List[SurfaceGeometry
 # ----------------------------------------------------------------------
 
 
-def _read_csv_if_exists(path: Path) -> Optional[pd.DataFrame]:
-    if path.exists():
-        return pd.read_csv(path)
-    return None
+# Tipi noti delle tabelle di attributi: l'id è sempre una stringa (es. SRF_0001_001),
+# gli altri campi finiscono tutti nei metadati e restano a inferenza di pandas
+_ATTRIBUTE_DTYPES = {"id": str}
+
 
-def _merge_dicts(base: Dict, extra: Dict) -> Dict:
+def _read_csv_if_exists(
+    model_dir: ModelSource,
+    name: str,
+    dtype: Optional[Dict[str, object]] = None,
+    usecols: Optional[List[str]] = None,
+) -> Optional[pd.DataFrame]:
+    # Niente exists() preliminare: un solo accesso al file (conta sui filesystem di rete)
+    try:
+        fh = open_model_file(model_dir, name)
+    except FileNotFoundError:
+        return None
+    with fh:
+        return pd.read_csv(fh, dtype=dtype, usecols=usecols, engine="c")
+
+
+def _read_attribute_table(model_dir: ModelSource, name: str) -> Dict[str, Dict]:
     """
-    Restituisce una copia di base con campi extra aggiunti solo se non presenti.
+    Legge una tabella di attributi del modello come {id: {colonna: valore}}.
     """
-    merged = dict(base)
-    for k, v in extra.items():
-        if k not in merged:
-            merged[k] = v
-    return merged
+    return _records_by_id(_read_csv_if_exists(model_dir, name, dtype=_ATTRIBUTE_DTYPES))
+
+
+def _records_by_id(df: Optional[pd.DataFrame]) -> Dict[str, Dict]:
+    """
+    Converte una tabella di attributi in {id (str): {colonna: valore}}.
+    Se un id si ripete vale l'ultima riga. Tabelle assenti o senza colonna id -> {}.
+    """
+    if df is None or "id" not in df.columns:
+        return {}
+    ids = df["id"].astype(str)
+    if ids.duplicated().any():
+        keep = ~ids.duplicated(keep="last")
+        df, ids = df[keep], ids[keep]
+    # Nomi colonna internati, come i campi di code_mapping (lookup più rapidi)
+    df = df.set_axis([sys.intern(str(c)) for c in df.columns], axis=1)
+    return df.set_index(ids).to_dict(orient="index")
+
+
+def _add_missing_fields(target: Dict[str, Dict], records: Dict[str, Dict]) -> None:
+    """
+    Aggiunge a target i campi di records, senza sovrascrivere quelli già presenti.
+    """
+    for sid, rec in records.items():
+        base = target.setdefault(sid, {})
+        for k, v in rec.items():
+            base.setdefault(k, v)
 
 
 def _sanitize_values(obj):
@@ -210,7 +392,18 @@ def _sanitize_values(obj):
     return obj
 
 
-def load_attributes(model_dir: Path) -> Dict[str, Dict[str, Dict]]:
+# Tabelle di attributi lette da load_attributes
+_ATTRIBUTE_FILES = (
+    "main_fault_attributes.csv",
+    "main_fault_derived_attributes.csv",
+    "main_fault_kinematics_attributes.csv",
+    "main_horizon_attributes.csv",
+    "main_horizon_derived_attributes.csv",
+    "main_unit_attributes.csv",
+)
+
+
+def load_attributes(model_dir: ModelSource) -> Dict[str, Dict[str, Dict]]:
     """
     Legge le tabelle degli attributi nella cartella del modello e
     restituisce un dizionario:
@@ -222,58 +415,63 @@ def load_attributes(model_dir: Path) -> Dict[str, Dict[str, Dict]]:
     }
 
     Ogni valore interno è un dict con tutte le colonne della riga.
+
+    Per le cartelle su disco le CSV lette sono memorizzate per (cartella,
+    mtime e dimensione delle tabelle): chiamate ripetute sullo stesso modello
+    non rileggono le CSV. Ogni chiamata restituisce comunque dict nuovi,
+    modificabili senza effetti sulle chiamate successive.
     """
-    attrs: Dict[str, Dict[str, Dict]] = {
-        "FAULT": {},
-        "HORIZON": {},
-        "UNIT": {},
-    }
+    model_dir = as_model_source(model_dir)
+    if isinstance(model_dir, dict):
+        return _read_attributes(model_dir)
+    model_dir = model_dir.resolve()
+    cached = _read_attributes_cached(model_dir, _attribute_stamps(model_dir))
+    return {g: {sid: dict(rec) for sid, rec in t.items()} for g, t in cached.items()}
 
-    # Faults - main
-    fault_attr = _read_csv_if_exists(model_dir / "main_fault_attributes.csv")
-    if fault_attr is not None and "id" in fault_attr.columns:
-        for _, row in fault_attr.iterrows():
-            sid = str(row["id"])
-            attrs["FAULT"][sid] = row.to_dict()
-
-    # Faults - derived
-    fault_der_attr = _read_csv_if_exists(model_dir / "main_fault_derived_attributes.csv")
-    if fault_der_attr is not None and "id" in fault_der_attr.columns:
-        for _, row in fault_der_attr.iterrows():
-            sid = str(row["id"])
-            merged = attrs["FAULT"].get(sid, {})
-            attrs["FAULT"][sid] = _merge_dicts(merged, row.to_dict())
-
-    # Faults - kinematics
-    fault_kin_attr = _read_csv_if_exists(model_dir / "main_fault_kinematics_attributes.csv")
-    if fault_kin_attr is not None and "id" in fault_kin_attr.columns:
-        for _, row in fault_kin_attr.iterrows():
-            sid = str(row["id"])
-            merged = attrs["FAULT"].get(sid, {})
-            attrs["FAULT"][sid] = _merge_dicts(merged, row.to_dict())
-
-    # Horizons - main
-    horiz_attr = _read_csv_if_exists(model_dir / "main_horizon_attributes.csv")
-    if horiz_attr is not None and "id" in horiz_attr.columns:
-        for _, row in horiz_attr.iterrows():
-            sid = str(row["id"])
-            attrs["HORIZON"][sid] = row.to_dict()
-
-    # Horizons - derived
-    horiz_der_attr = _read_csv_if_exists(model_dir / "main_horizon_derived_attributes.csv")
-    if horiz_der_attr is not None and "id" in horiz_der_attr.columns:
-        for _, row in horiz_der_attr.iterrows():
-            sid = str(row["id"])
-            merged = attrs["HORIZON"].get(sid, {})
-            attrs["HORIZON"][sid] = _merge_dicts(merged, row.to_dict())
+
+def _attribute_stamps(model_dir: Path) -> Tuple[Optional[Tuple[int, int]], ...]:
+    """
+    (mtime in ns, dimensione) di ciascuna tabella di attributi, None se assente.
+    Una sola scansione della cartella: stat solo sulle tabelle presenti.
+    """
+    try:
+        with os.scandir(model_dir) as it:
+            entries = {entry.name: entry for entry in it if entry.name in _ATTRIBUTE_FILES}
+    except FileNotFoundError:
+        entries = {}
+    return tuple(
+        (entries[name].stat().st_mtime_ns, entries[name].stat().st_size) if name in entries else None
+        for name in _ATTRIBUTE_FILES
+    )
+
+
+@lru_cache(maxsize=8)
+def _read_attributes_cached(
+    model_dir: Path, stamps: Tuple[Optional[Tuple[int, int]], ...]
+) -> Dict[str, Dict[str, Dict]]:
+    # stamps fa solo da chiave: se una tabella cambia, la cache non è più valida.
+    # Il risultato è condiviso: load_attributes ne restituisce sempre una copia
+    return _read_attributes(model_dir)
+
+
+def _read_attributes(model_dir: ModelSource) -> Dict[str, Dict[str, Dict]]:
+    # Faults: main + derived + kinematics (campi aggiunti solo se mancanti)
+    faults = _read_attribute_table(model_dir, "main_fault_attributes.csv")
+    _add_missing_fields(faults, _read_attribute_table(model_dir, "main_fault_derived_attributes.csv"))
+    _add_missing_fields(faults, _read_attribute_table(model_dir, "main_fault_kinematics_attributes.csv"))
+
+    # Horizons: main + derived
+    horizons = _read_attribute_table(model_dir, "main_horizon_attributes.csv")
+    _add_missing_fields(horizons, _read_attribute_table(model_dir, "main_horizon_derived_attributes.csv"))
 
     # Units
-    unit_attr = _read_csv_if_exists(model_dir / "main_unit_attributes.csv")
-    if unit_attr is not None and "id" in unit_attr.columns:
-        for _, row in unit_attr.iterrows():
-            sid = str(row["id"])
-            attrs["UNIT"][sid] = row.to_dict()
+    units = _read_attribute_table(model_dir, "main_unit_attributes.csv")
 
+    attrs: Dict[str, Dict[str, Dict]] = {
+        "FAULT": faults,
+        "HORIZON": horizons,
+        "UNIT": units,
+    }
     return attrs
 
 
@@ -282,6 +480,7 @@ def load_attributes(model_dir: Path) -> Dict[str, Dict[str, Dict]]:
 # ----------------------------------------------------------------------
 
 
+@lru_cache(maxsize=None)
 def _load_color_scheme(csv_path: Optional[Path] = None) -> Dict[int, Tuple[int, int, int]]:
     """
     Carica la palette da color_scheme.csv (colonne: color, CMYK_code, RGB_code)
@@ -291,10 +490,12 @@ def _load_color_scheme(csv_path: Optional[Path] = None) -> Dict[int, Tuple[int,
         csv_path = Path(__file__).resolve().parents[2] / "examples" / "color_scheme.csv"
 
     palette: Dict[int, Tuple[int, int, int]] = {}
-    if not csv_path.exists():
+    try:
+        f = csv_path.open("r", encoding="utf-8")
+    except FileNotFoundError:
         return palette
 
-    with csv_path.open("r", encoding="utf-8") as f:
+    with f:
         reader = csv.DictReader(f)
         for row in reader:
             try:
@@ -314,11 +515,39 @@ def _load_color_scheme(csv_path: Optional[Path] = None) -> Dict[int, Tuple[int,
     return palette
 
 
+def _build_palette_lut(palette: Dict[int, Tuple[int, int, int]]) -> np.ndarray:
+    """
+    Converte la palette in una tabella (max codice + 1, 4) uint8 indicizzata
+    per codice colore. I codici assenti dalla palette hanno alpha 0.
+    """
+    codes = [code for code in palette if code >= 0]
+    lut = np.zeros((max(codes) + 1 if codes else 0, 4), dtype=np.uint8)
+    for code in codes:
+        lut[code, :3] = palette[code]
+        lut[code, 3] = 255
+    return lut
+
+
+def _resolve_colors(color_codes: List[object], lut: np.ndarray) -> np.ndarray:
+    """
+    Colori RGBA (N, 4) uint8 per una lista di codici colore (int, float interi
+    o stringhe numeriche). Codici mancanti, non numerici o fuori palette
+    danno una riga con alpha 0.
+    """
+    codes = pd.to_numeric(pd.Series(color_codes, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+    valid = np.isfinite(codes)
+    valid[valid] = (codes[valid] >= 0) & (codes[valid] < len(lut)) & (codes[valid] == np.floor(codes[valid]))
+    rgba = np.zeros((len(codes), 4), dtype=np.uint8)
+    rgba[valid] = lut[codes[valid].astype(np.int64)]
+    return rgba
+
+
 # ----------------------------------------------------------------------
 # Mapping codici -> etichette/URL tramite codelist
 # ----------------------------------------------------------------------
 
 
+@lru_cache(maxsize=None)
 def _load_code_mapping(csv_path: Optional[Path] = None) -> Dict[str, str]:
     """
     Legge code_mapping.csv e restituisce un dizionario
@@ -328,91 +557,119 @@ def _load_code_mapping(csv_path: Optional[Path] = None) -> Dict[str, str]:
         csv_path = Path(__file__).resolve().parents[2] / "examples" / "code_mapping.csv"
 
     mapping: Dict[str, str] = {}
-    if not csv_path.exists():
+    try:
+        f = csv_path.open("r", encoding="utf-8")
+    except FileNotFoundError:
         return mapping
 
-    with csv_path.open("r", encoding="utf-8") as f:
+    with f:
         reader = csv.DictReader(f)
         for row in reader:
             field = (row.get("field_name") or "").strip()
             src = (row.get("source_file") or "").strip()
             if field and src:
-                mapping[field] = src
+                # Internati: coincidono con i nomi colonna delle tabelle di attributi
+                mapping[sys.intern(field)] = src
     return mapping
 
 
-def _load_codelists(source_files: List[str], zip_path: Optional[Path] = None) -> Dict[str, Dict[str, Dict[str, Optional[str]]]]:
+@lru_cache(maxsize=None)
+def _load_codelists(source_files: FrozenSet[str], zip_path: Optional[Path] = None) -> Dict[str, Dict[str, Dict[str, Optional[str]]]]:
     """
     Carica le codelist richieste da un archivio zip.
     Ritorna: {source_file: {code: {"label": ..., "url": ...}}}
+
+    Palette, code mapping e codelist sono file del pacchetto che non
+    cambiano durante il processo: i loader sono memorizzati con lru_cache
+    e restituiscono dizionari condivisi, da non modificare.
     """
     if zip_path is None:
         zip_path = Path(__file__).resolve().parents[2] / "examples" / "codelist.zip"
 
     codelists: Dict[str, Dict[str, Dict[str, Optional[str]]]] = {}
-    if not zip_path.exists():
-        return codelists
-
     needed = {src for src in source_files if src}
     if not needed:
         return codelists
 
-    with zipfile.ZipFile(zip_path, "r") as zf:
+    try:
+        zf = zipfile.ZipFile(zip_path, "r")
+    except FileNotFoundError:
+        return codelists
+
+    with zf:
+        members = set(zf.namelist())
         for src in needed:
             inner_path = f"codelist/{src}"
-            if inner_path not in zf.namelist():
+            if inner_path not in members:
                 continue
             with zf.open(inner_path, "r") as fh:
-                reader = csv.DictReader(TextIOWrapper(fh, encoding="utf-8"))
+                reader = csv.reader(TextIOWrapper(fh, encoding="utf-8"))
                 code_dict: Dict[str, Dict[str, Optional[str]]] = {}
-                for row in reader:
-                    # Trova le colonne code/label/url in maniera robusta
-                    keys = {k.lower(): k for k in row.keys() if k}
-                    code_key = keys.get("code")
-                    url_key = None
-                    for cand in ("url", "uri", "link"):
-                        if cand in keys:
-                            url_key = keys[cand]
-                            break
-                    # Prima scelta label è "type", altrimenti prima colonna diversa da code/url
-                    label_key = None
-                    for cand in ("type", "label", "description", "name"):
-                        if cand in keys:
-                            label_key = keys[cand]
-                            break
-                    if not label_key:
-                        for k in row.keys():
-                            lk = k.lower()
-                            if lk not in ("code", "url", "uri", "link"):
-                                label_key = k
-                                break
-
-                    if not code_key:
-                        continue
-
-                    code_val = (row.get(code_key) or "").strip()
-                    if not code_val:
-                        continue
-                    label_val = (row.get(label_key) or "").strip() if label_key else None
-                    url_val = (row.get(url_key) or "").strip() if url_key else None
-                    code_dict[code_val] = {"label": label_val or None, "url": url_val or None}
+                # Colonne code/label/url cercate una volta sola sull'intestazione
+                code_ix, label_ix, url_ix = _codelist_columns(next(reader, []))
+                if code_ix is not None:
+                    for row in reader:
+                        n = len(row)
+                        if code_ix >= n:
+                            continue
+                        code_val = row[code_ix].strip()
+                        if not code_val:
+                            continue
+                        label_val = row[label_ix].strip() if label_ix is not None and label_ix < n else None
+                        url_val = row[url_ix].strip() if url_ix is not None and url_ix < n else None
+                        code_dict[code_val] = {"label": label_val or None, "url": url_val or None}
 
                 codelists[src] = code_dict
 
     return codelists
 
 
-def _apply_code_mapping(attrs: Dict[str, object], code_mapping: Dict[str, str], codelists: Dict[str, Dict[str, Dict[str, Optional[str]]]]) -> Dict[str, object]:
+def _codelist_columns(header: List[str]) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """
+    Indici delle colonne (code, label, url) di una codelist, trovati in
+    maniera robusta dall'intestazione. Per la label la prima scelta è "type",
+    altrimenti la prima colonna diversa da code/url.
+    """
+    index = {name.lower(): i for i, name in enumerate(header) if name}
+    code_ix = index.get("code")
+    url_ix = next((index[cand] for cand in ("url", "uri", "link") if cand in index), None)
+    label_ix = next((index[cand] for cand in ("type", "label", "description", "name") if cand in index), None)
+    if label_ix is None:
+        for i, name in enumerate(header):
+            if name.lower() not in ("code", "url", "uri", "link"):
+                label_ix = i if name else None
+                break
+    return code_ix, label_ix, url_ix
+
+
+CodeLookup = Dict[str, Dict[str, Dict[str, Optional[str]]]]
+
+
+def _build_code_lookup(code_mapping: Dict[str, str], codelists: Dict[str, Dict[str, Dict[str, Optional[str]]]]) -> CodeLookup:
+    """
+    Unisce code mapping e codelist in {campo: {code: {"label": ..., "url": ...}}},
+    così ogni attributo richiede un solo accesso per trovare la sua codelist.
+    I campi senza codelist (o con codelist vuota) restano fuori.
+    """
+    lookup: CodeLookup = {}
+    for field, src_file in code_mapping.items():
+        codes = codelists.get(src_file)
+        if codes:
+            lookup[field] = codes
+    return lookup
+
+
+def _apply_code_mapping(attrs: Dict[str, object], code_lookup: CodeLookup) -> Dict[str, object]:
     """
     Sostituisce i codici con dizionari {code, label, url} se trovati nella codelist.
     Mantiene i valori originali se non c'è corrispondenza.
     """
     mapped: Dict[str, object] = {}
     for key, val in attrs.items():
-        src_file = code_mapping.get(key)
-        if src_file and val is not None:
+        codes = code_lookup.get(key)
+        if codes is not None and val is not None:
             code_str = str(val).strip()
-            info = codelists.get(src_file, {}).get(code_str)
+            info = codes.get(code_str)
             if info:
                 mapped[key] = {"code": code_str, "label": info.get("label"), "url": info.get("url")}
                 continue
@@ -420,15 +677,98 @@ def _apply_code_mapping(attrs: Dict[str, object], code_mapping: Dict[str, str],
     return mapped
 
 
+# ----------------------------------------------------------------------
+# Collegamento superfici -> tabelle di attributi
+# ----------------------------------------------------------------------
+
+
+def _surface_attributes(surf: SurfaceGeometry, attrs: Dict[str, Dict[str, Dict]]) -> Tuple[Dict, object]:
+    """
+    Attributi grezzi e codice colore di una superficie, dalla tabella del suo gruppo.
+    """
+    if surf.group == "FAULT":
+        raw_attrs = attrs["FAULT"].get(surf.id, {})
+        color_code = raw_attrs.get("color_fault")
+    elif surf.group == "HORIZON":
+        raw_attrs = attrs["HORIZON"].get(surf.id, {})
+        color_code = raw_attrs.get("color_surface")
+    elif surf.group == "UNIT":
+        raw_attrs = attrs["UNIT"].get(surf.id, {})
+        color_code = raw_attrs.get("color_unit")
+    else:
+        # DEM: nessuna tabella dedicata
+        raw_attrs = {}
+        color_code = None
+    return raw_attrs, color_code
+
+
+# ----------------------------------------------------------------------
+# Condivisione delle geometrie identiche
+# ----------------------------------------------------------------------
+
+
+def _geometry_key(surf: SurfaceGeometry, rgba: np.ndarray) -> bytes:
+    """
+    Impronta di vertici (relativi al baricentro), facce e colore di una superficie.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(surf.vertices).data)
+    h.update(np.ascontiguousarray(surf.faces).data)
+    h.update(rgba.tobytes())
+    return h.digest()
+
+
+def _same_geometry(cached: Tuple[SurfaceGeometry, np.ndarray], surf: SurfaceGeometry, rgba: np.ndarray) -> bool:
+    """
+    Verifica completa dopo una corrispondenza di impronta.
+    """
+    other, other_rgba = cached
+    return (
+        np.array_equal(other_rgba, rgba)
+        and np.array_equal(other.vertices, surf.vertices)
+        and np.array_equal(other.faces, surf.faces)
+    )
+
+
+# ----------------------------------------------------------------------
+# Lettura dei file .ts del modello
+# ----------------------------------------------------------------------
+
+
+def _parse_model_ts_file(model_dir: ModelSource, fname: str, group: str) -> List[SurfaceGeometry]:
+    """
+    Legge e parsa il file .ts `fname` del modello (anche in un processo separato).
+    Se il file non c'è restituisce una lista vuota.
+    """
+    try:
+        fh = open_model_file(model_dir, fname)
+    except FileNotFoundError:
+        return []
+    with fh:
+        lines = TextIOWrapper(fh, encoding="utf-8", errors="ignore")
+        return parse_gocad_tsurf_lines(lines, group)
+
+
+def _single_file_source(model_dir: ModelSource, fname: str) -> ModelSource:
+    """
+    Sorgente da inviare a un processo worker: per i modelli in memoria solo
+    il file richiesto, così da non serializzare l'intero ZIP a ogni job.
+    """
+    if isinstance(model_dir, dict):
+        return {fname: model_dir[fname]}
+    return model_dir
+
+
 # ----------------------------------------------------------------------
 # Costruzione della scena completa (DEM + horizons + faults + units)
 # ----------------------------------------------------------------------
 
 
-def build_full_scene(model_dir: Path) -> Tuple[trimesh.Scene, Dict[str, Dict]]:
+def build_full_scene(model_dir: ModelSource) -> Tuple[trimesh.Scene, Dict[str, Dict]]:
     """
     Costruisce la scena 3D completa a partire dai file .ts nella cartella
-    del modello e collega gli attributi alle superfici.
+    del modello (o nel contenuto dello ZIP in memoria) e collega gli
+    attributi alle superfici.
 
     Ritorna:
       - scene: trimesh.Scene
@@ -445,13 +785,14 @@ def build_full_scene(model_dir: Path) -> Tuple[trimesh.Scene, Dict[str, Dict]]:
       ...
     }
     """
-    model_dir = Path(model_dir)
+    model_dir = as_model_source(model_dir)
 
     # 1. Carico attributi
     attrs = load_attributes(model_dir)
     palette = _load_color_scheme()
     code_mapping = _load_code_mapping()
-    codelists = _load_codelists(list(code_mapping.values()))
+    codelists = _load_codelists(frozenset(code_mapping.values()))
+    code_lookup = _build_code_lookup(code_mapping, codelists)
 
     # 2. Parsing TSurf
     surfaces: List[SurfaceGeometry] = []
@@ -463,72 +804,94 @@ def build_full_scene(model_dir: Path) -> Tuple[trimesh.Scene, Dict[str, Dict]]:
         ("units.ts", "UNIT"),
     ]
 
-    for fname, group in ts_files:
-        ts_path = model_dir / fname
-        if ts_path.exists():
-            surfaces.extend(parse_gocad_tsurf_file(ts_path, group))
+    # Solo i file presenti: il pool si dimensiona su quelli e non si
+    # mandano ai worker job destinati a fallire
+    if isinstance(model_dir, dict):
+        jobs = [(fname, group) for fname, group in ts_files if fname in model_dir]
+    else:
+        jobs = [(fname, group) for fname, group in ts_files if (model_dir / fname).exists()]
+
+    # I file sono indipendenti: con più core li si parsa in processi separati
+    # (il parsing è legato al GIL), raccogliendo i risultati nell'ordine di ts_files.
+    # Con un solo file (o un solo core) si parsa direttamente
+    workers = min(len(jobs), os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_parse_model_ts_file, _single_file_source(model_dir, fname), fname, group)
+                for fname, group in jobs
+            ]
+            for future in futures:
+                surfaces.extend(future.result())
+    else:
+        for fname, group in jobs:
+            surfaces.extend(_parse_model_ts_file(model_dir, fname, group))
 
     # 3. Arricchisco con attributi e creo la scena
     scene = trimesh.Scene()
     surfaces_metadata: Dict[str, Dict] = {}
 
-    for surf in surfaces:
-        # Collega attributi se presenti
-        if surf.group == "FAULT":
-            raw_attrs = attrs["FAULT"].get(surf.id, {})
-            nice_name = str(raw_attrs.get("name_fault", surf.id))
-            color_code = raw_attrs.get("color_fault")
-        elif surf.group == "HORIZON":
-            raw_attrs = attrs["HORIZON"].get(surf.id, {})
-            nice_name = str(raw_attrs.get("name_surface", surf.id))
-            color_code = raw_attrs.get("color_surface")
-        elif surf.group == "UNIT":
-            raw_attrs = attrs["UNIT"].get(surf.id, {})
-            nice_name = str(raw_attrs.get("name_unit", surf.id))
-            color_code = raw_attrs.get("color_unit")
-        else:
-            # DEM: nessuna tabella dedicata
-            raw_attrs = {}
-            nice_name = surf.id
-            color_code = None
+    # Collega attributi se presenti; i codici colore sono risolti tutti insieme
+    linked = [_surface_attributes(surf, attrs) for surf in surfaces]
+    group_attrs = [raw_attrs for raw_attrs, _ in linked]
+    color_codes = [color_code for _, color_code in linked]
+    surface_colors = _resolve_colors(color_codes, _build_palette_lut(palette))
+    geometry_cache: Dict[bytes, Tuple[Tuple[SurfaceGeometry, np.ndarray], str]] = {}
 
+    for surf, raw_attrs, rgba in zip(surfaces, group_attrs, surface_colors):
         # Ripulisce NaN/inf da attributi
         raw_attrs = _sanitize_values(raw_attrs)
 
         # Applico mapping dei codici a etichette/URL (mantiene i valori non mappati)
-        surf.attributes = _apply_code_mapping(raw_attrs, code_mapping, codelists)
+        surf.attributes = _apply_code_mapping(raw_attrs, code_lookup)
 
         # Aggiorno node_name solo con gruppo e id (richiesta)
         surf.node_name = f"{surf.group}_{surf.id}"
 
-        # Creo la mesh
-        if surf.faces is not None and len(surf.faces) > 0:
+        # Se non ci sono facce, salto (oppure potresti gestirla come point cloud)
+        if surf.faces is None or len(surf.faces) == 0:
+            continue
+
+        # Il baricentro sottratto in parsing torna come traslazione del nodo
+        transform = None
+        if surf.origin is not None:
+            transform = trimesh.transformations.translation_matrix(surf.origin)
+
+        # Superfici identiche (stessi vertici relativi, facce e colore)
+        # condividono la geometria: un solo mesh glTF, più nodi
+        key = _geometry_key(surf, rgba)
+        shared = geometry_cache.get(key)
+        if shared is not None and _same_geometry(shared[0], surf, rgba):
+            scene.graph.update(
+                frame_to=surf.node_name,
+                frame_from=scene.graph.base_frame,
+                geometry=shared[1],
+                matrix=transform,
+            )
+        else:
+            # Creo la mesh
+            # trimesh conserva vertici/facce come float64/int64 contigui e li
+            # converte in float32/uint32 solo in export: la conversione dai
+            # float32/uint32 del parser si fa qui, una volta, e il costruttore
+            # non fa altre copie
             mesh = trimesh.Trimesh(
-                vertices=surf.vertices,
-                faces=surf.faces,
+                vertices=np.ascontiguousarray(surf.vertices, dtype=np.float64),
+                faces=np.ascontiguousarray(surf.faces, dtype=np.int64),
                 process=False,
             )
 
-            # Applico colore se disponibile nella palette
-            rgba = None
-            try:
-                if color_code is not None:
-                    code_int = int(str(color_code))
-                    if code_int in palette:
-                        r, g, b = palette[code_int]
-                        rgba = [r, g, b, 255]
-            except Exception:
-                rgba = None
-
-            if rgba is not None:
-                mesh.visual.face_colors = np.tile(np.array(rgba, dtype=np.uint8), (len(mesh.faces), 1))
-
-        else:
-            # Se non ci sono facce, salto (oppure potresti gestirla come point cloud)
-            continue
-
-        # Aggiungo la geometria alla scena
-        scene.add_geometry(mesh, node_name=surf.node_name)
+            # Applico colore se disponibile nella palette (alpha 0 = nessun colore).
+            # Ogni superficie ha un solo colore: va nel baseColorFactor del
+            # materiale glTF invece che in un accessor COLOR_0 per vertice
+            if rgba[3]:
+                mesh.visual = trimesh.visual.TextureVisuals(
+                    material=PBRMaterial(baseColorFactor=rgba, doubleSided=True)
+                )
+
+            # Aggiungo la geometria alla scena
+            scene.add_geometry(mesh, node_name=surf.node_name, transform=transform)
+            _, geom_name = scene.graph[surf.node_name]
+            geometry_cache.setdefault(key, ((surf, rgba), geom_name))
 
         # Salvo metadati minimi per questa superficie
         surfaces_metadata[surf.id] = {
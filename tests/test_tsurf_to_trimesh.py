@@ -0,0 +1,35 @@
+import warnings
+
+from geoit3d_to_gltf.tsurf_to_trimesh import load_attributes, parse_gocad_tsurf_text
+
+
+def _surface(name: str, body: str) -> str:
+    return f"GOCAD TSurf 1\nHEADER {{\nname:{name}\n}}\nTFACE\n{body}END\n"
+
+
+GOOD = _surface("GOOD", "VRTX 1 0 0 0\nVRTX 2 1 0 0\nVRTX 3 0 1 0\nTRGL 1 2 3\n")
+
+
+def test_all_malformed_vertices_with_triangles_are_skipped():
+    # Nessun vertice valido ma righe TRGL presenti: la superficie va scartata
+    text = _surface("BAD", "VRTX x 0 0 0\nPVRTX 2 1 0\nTRGL 1 2 3\n") + GOOD
+    surfaces = parse_gocad_tsurf_text(text, "HORIZON")
+    assert [s.id for s in surfaces] == ["GOOD"]
+
+
+def test_all_malformed_vertices_without_triangles_are_skipped():
+    text = _surface("BAD", "VRTX x 0 0 0\nPVRTX 2 1 0\n") + GOOD
+    with warnings.catch_warnings():
+        # niente baricentro NaN da una media su zero vertici
+        warnings.simplefilter("error", RuntimeWarning)
+        surfaces = parse_gocad_tsurf_text(text, "HORIZON")
+    assert [s.id for s in surfaces] == ["GOOD"]
+    assert len(surfaces[0].vertices) == 3
+
+
+def test_load_attributes_returns_fresh_dicts(tmp_path):
+    (tmp_path / "main_unit_attributes.csv").write_text("id,name_unit\nUNT_0001_001,AES\n")
+    first = load_attributes(tmp_path)
+    first["UNIT"]["UNT_0001_001"]["name_unit"] = "MODIFICATO"
+    first["UNIT"].clear()
+    assert load_attributes(tmp_path)["UNIT"] == {"UNT_0001_001": {"id": "UNT_0001_001", "name_unit": "AES"}}